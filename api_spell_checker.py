@@ -1,48 +1,71 @@
-import cv2
-import pytesseract
-from PIL import Image
-import numpy as np
-import re
-import requests
-import json
+import sys
+
+import batch_check
+import languagetool
+import lexicon
+from cascade import TIERS, CheckCascade
+from phrase_rules import PhraseAutomaton
 
 class APISpellChecker:
-    def __init__(self):
-        print("API Spell Checker initialized - can handle ANY word!")
+    # Offline fallback with common corrections
+    CORRECTIONS = {
+        'laptp': 'laptop', 'compter': 'computer', 'mobil': 'mobile',
+        'hellow': 'hello', 'wrold': 'world', 'teh': 'the', 'adn': 'and',
+        'recieve': 'receive', 'seperate': 'separate', 'definately': 'definitely',
+        'occured': 'occurred', 'begining': 'beginning', 'untill': 'until',
+        'wich': 'which', 'thier': 'their', 'freind': 'friend', 'beleive': 'believe',
+        'achive': 'achieve', 'wierd': 'weird', 'neccessary': 'necessary',
+        'embarass': 'embarrass', 'accomodate': 'accommodate', 'existance': 'existence',
+        'maintainance': 'maintenance', 'occassion': 'occasion', 'priviledge': 'privilege',
+        'recomend': 'recommend', 'succesful': 'successful', 'tommorrow': 'tomorrow',
+        'truely': 'truly', 'usefull': 'useful', 'wether': 'whether',
+        'programing': 'programming', 'sofware': 'software', 'hardwar': 'hardware',
+        'keyborad': 'keyboard', 'mous': 'mouse', 'scren': 'screen', 'moniter': 'monitor',
+        'camra': 'camera', 'phon': 'phone', 'tabl': 'table', 'char': 'chair',
+        'buk': 'book', 'pen': 'pen', 'papr': 'paper', 'wat': 'water',
+        'fd': 'food', 'hous': 'house', 'car': 'car', 'tre': 'tree',
+        'flwr': 'flower', 'bir': 'bird', 'ca': 'cat', 'do': 'dog'
+    }
+    # Compiled once for every instance's cascade
+    RULES = PhraseAutomaton(CORRECTIONS)
+    
+    def __init__(self, tiers=TIERS, language='en-US'):
+        self.language = language
+        # Local tiers resolve most words; only the residue goes online.
+        # The corrections table is English only.
+        self.cascade = CheckCascade(
+            lexicon.get_lexicon(language),
+            self.RULES if lexicon.is_english(language) else None,
+            remote=self.check_with_apis, tiers=tiers
+        )
+        print("API Spell Checker initialized - can handle ANY word!", file=sys.stderr)
     
-    def check_with_api(self, word):
-        """Check spelling using online API"""
+    def check_with_apis(self, words):
+        """Remote tier: ask the online APIs about words nothing local resolved"""
         try:
-            # Using LanguageTool API for spell checking
-            url = "https://api.languagetool.org/v2/check"
-            data = {
-                'text': word,
-                'language': 'en-US'
-            }
-            
-            response = requests.post(url, data=data, timeout=5)
-            if response.status_code == 200:
-                result = response.json()
-                if result['matches']:
-                    # Get the first suggestion
-                    suggestions = result['matches'][0].get('replacements', [])
-                    if suggestions:
-                        return suggestions[0]['value']
-            
-            # Fallback to another API if first fails
-            return self.check_with_textgears(word)
-            
+            # All the leftover words go to LanguageTool in batched requests
+            found = languagetool.check_words(words, self.language)
         except Exception as e:
-            print(f"API error: {e}")
-            return self.offline_suggestion(word)
+            print(f"API error: {e}", file=sys.stderr)
+            return {}
+
+        # Misspelled without a suggestion: try TextGears for just those
+        for word in words:
+            if word not in found:
+                suggestion = self.check_with_textgears(word)
+                if not suggestion.startswith("No suggestion"):
+                    found[word] = suggestion if suggestion.lower() != word else None
+        return found
     
     def check_with_textgears(self, word):
         """Fallback API using TextGears"""
         try:
+            import requests
+
             url = "https://api.textgears.com/spelling"
             params = {
                 'text': word,
-                'language': 'en-US',
+                'language': self.language,
                 'key': 'free'  # Free tier
             }
             
@@ -61,58 +84,27 @@ class APISpellChecker:
     
     def offline_suggestion(self, word):
         """Offline fallback with common corrections"""
-        corrections = {
-            'laptp': 'laptop', 'compter': 'computer', 'mobil': 'mobile',
-            'hellow': 'hello', 'wrold': 'world', 'teh': 'the', 'adn': 'and',
-            'recieve': 'receive', 'seperate': 'separate', 'definately': 'definitely',
-            'occured': 'occurred', 'begining': 'beginning', 'untill': 'until',
-            'wich': 'which', 'thier': 'their', 'freind': 'friend', 'beleive': 'believe',
-            'achive': 'achieve', 'wierd': 'weird', 'neccessary': 'necessary',
-            'embarass': 'embarrass', 'accomodate': 'accommodate', 'existance': 'existence',
-            'maintainance': 'maintenance', 'occassion': 'occasion', 'priviledge': 'privilege',
-            'recomend': 'recommend', 'succesful': 'successful', 'tommorrow': 'tomorrow',
-            'truely': 'truly', 'usefull': 'useful', 'wether': 'whether',
-            'programing': 'programming', 'sofware': 'software', 'hardwar': 'hardware',
-            'keyborad': 'keyboard', 'mous': 'mouse', 'scren': 'screen', 'moniter': 'monitor',
-            'camra': 'camera', 'phon': 'phone', 'tabl': 'table', 'char': 'chair',
-            'buk': 'book', 'pen': 'pen', 'papr': 'paper', 'wat': 'water',
-            'fd': 'food', 'hous': 'house', 'car': 'car', 'tre': 'tree',
-            'flwr': 'flower', 'bir': 'bird', 'ca': 'cat', 'do': 'dog'
-        }
-        
-        return corrections.get(word.lower(), f"No suggestion for '{word}'")
+        return self.CORRECTIONS.get(word.lower(), f"No suggestion for '{word}'")
     
-    def is_word_correct(self, word):
-        """Check if word is spelled correctly using API"""
-        try:
-            url = "https://api.languagetool.org/v2/check"
-            data = {
-                'text': word,
-                'language': 'en-US'
-            }
-            
-            response = requests.post(url, data=data, timeout=3)
-            if response.status_code == 200:
-                result = response.json()
-                return len(result['matches']) == 0  # No matches means correct spelling
-            
-            return True  # Assume correct if API fails
-            
-        except:
-            return True  # Assume correct if API fails
+    def find_mistakes(self, text):
+        """Find misspelled words with their offsets and suggestions"""
+        result = self.cascade.check(text)
+        # Words the APIs flagged without a suggestion are still mistakes
+        mistakes = [
+            {'word': m['word'], 'offset': m['offset'], 'suggestions': m.get('suggestions', [])}
+            for m in result['mistakes'] + result['unresolved']
+        ]
+        
+        return sorted(mistakes, key=lambda m: m['offset'])
     
     def check_text(self, text):
         """Check entire text for spelling mistakes"""
-        words = re.findall(r'\b[a-zA-Z]+\b', text)
-        mistakes = []
-        
         print("Checking spelling using online APIs...")
         
-        for word in words:
-            if not self.is_word_correct(word):
-                suggestion = self.check_with_api(word)
-                if suggestion and suggestion != word.lower():
-                    mistakes.append(f"'{word}' -> '{suggestion}'")
+        mistakes = [
+            f"'{m['word']}' -> '{m['suggestions'][0] if m['suggestions'] else 'No suggestion'}'"
+            for m in self.find_mistakes(text)
+        ]
         
         if not mistakes:
             return "No spelling mistakes found!"
@@ -121,6 +113,9 @@ class APISpellChecker:
     
     def check_from_camera(self):
         """Check spelling from camera input"""
+        import cv2
+        import pytesseract
+
         cap = cv2.VideoCapture(0)
         
         while True:
@@ -149,7 +144,12 @@ class APISpellChecker:
         cap.release()
         cv2.destroyAllWindows()
 
-def main():
+def main(argv=None):
+    if argv is None:
+        argv = sys.argv[1:]
+    if argv:
+        return batch_check.main(APISpellChecker, argv, prog='api_spell_checker.py')
+    
     print("Starting API-based Spell Checker...")
     checker = APISpellChecker()
     
@@ -173,4 +173,4 @@ def main():
             break
 
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    sys.exit(main())
\ No newline at end of file
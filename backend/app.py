@@ -1,11 +1,23 @@
 from flask import Flask, request, jsonify, render_template
 from flask_cors import CORS
-import requests
-import re
+import os
+import sys
 import io
-import PyPDF2
+import bisect
+import functools
+import secrets
+import threading
+import time
 import zipfile
-from bs4 import BeautifulSoup
+from collections import OrderedDict
+
+# The shared checker modules live at the repository root
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import languagetool
+import lexicon
+from cascade import TIERS, CheckCascade, cased
+from phrase_rules import PhraseAutomaton
 
 app = Flask(__name__, 
             template_folder='../frontend/templates', 
@@ -13,8 +25,22 @@ app = Flask(__name__,
 CORS(app)
 
 
+# Shown next to each mistake, by the cascade tier that found it
+TIER_CONTEXT = {
+    'corrections': 'Common misspelling',
+    'index': 'Not in dictionary',
+    'remote': 'Spelling error'
+}
+
+
+# Processes one large check may fork. Each worker forks its own pool, so
+# keep this small when gunicorn runs several workers; 1 turns sharding off.
+# Threaded servers never shard (see batch_check.check_sharded).
+CHECK_JOBS = int(os.environ.get('CHECK_JOBS', 2))
+
+
 class SpellCheckerAPI:
-    def __init__(self):
+    def __init__(self, tiers=TIERS):
         self.corrections = {
             'laptp': 'laptop',
             'compter': 'computer',
@@ -37,52 +63,267 @@ class SpellCheckerAPI:
             'sofware': 'software'
         }
 
-    def check_with_api(self, text):
-        try:
-            url = "https://api.languagetool.org/v2/check"
-            data = {
-                'text': text,
-                'language': 'en-US'
+        # Compiled once and shared by every language's cascade
+        self.rules = PhraseAutomaton(self.corrections)
+
+        self.tiers = tiers
+        self.cascades = {}
+
+    def get_cascade(self, language='en-US'):
+        # One per language: the corrections table is English only, and the
+        # remote tier has to ask for the right language. Lexicons are passed
+        # per call since they can be evicted and reloaded.
+        if language not in self.cascades:
+            cascade = CheckCascade(
+                corrections=self.rules if lexicon.is_english(language) else None,
+                remote=functools.partial(self.check_with_api, language=language),
+                tiers=self.tiers
+            )
+            cascade.jobs = CHECK_JOBS
+            self.cascades[language] = cascade
+        return self.cascades[language]
+
+    def get_lexicon(self, dictionary=None, language='en-US'):
+        # Raises KeyError for an unknown dictionary or language
+        return lexicon.get_layered(dictionary, language)
+
+    def check(self, text, dictionary=None, language='en-US'):
+        current = self.get_lexicon(dictionary, language)
+        result = self.get_cascade(language).check(text, current)
+        mistakes = [
+            {
+                'word': m['word'],
+                'offset': m['offset'],
+                'suggestion': m['suggestions'][0],
+                'context': TIER_CONTEXT[m['tier']]
             }
-
-            response = requests.post(url, data=data, timeout=10)
-
-            if response.status_code == 200:
-                result = response.json()
-                mistakes = []
-
-                for match in result['matches']:
-                    word = text[match['offset']:match['offset'] + match['length']]
-                    suggestions = match.get('replacements', [])
-
-                    if suggestions:
-                        mistakes.append({
-                            'word': word,
-                            'suggestion': suggestions[0]['value'],
-                            'context': match.get('message', 'Spelling error')
-                        })
-
-                return mistakes
-
-        except Exception:
-            return self.offline_check(text)
-
-    def offline_check(self, text):
-        words = re.findall(r'\b[a-zA-Z]+\b', text)
+            for m in result['mistakes']
+        ]
+
+        return mistakes, result['tiers']
+
+    def verdicts(self, words, current, language='en-US'):
+        # Per-word (tier, suggestions) for callers that cache them (edit
+        # sessions); unresolved words are left out so they are retried later
+        return self.get_cascade(language).resolve_words(words, current)
+
+    def check_with_api(self, words, language='en-US'):
+        # Remote tier: only words no local tier could resolve get here
+        return languagetool.check_words(words, language)
+
+
+class EditSession:
+    """A document being edited, kept as paragraphs with cached results.
+
+    Edits only re-tokenize the paragraphs they touch, and words are looked
+    up through a per-session verdict cache, so the cascade (and the remote
+    API behind it) only ever sees words new to this document.
+    """
+
+    def __init__(self, checker, text, dictionary=None, language='en-US'):
+        self.checker = checker
+        self.dictionary = dictionary
+        self.language = language
+        self.lock = threading.Lock()
+        self.touched = time.monotonic()
+        # lowercase word -> (tier, suggestions), suggestions None when correct
+        self.verdicts = {}
+        self.layers = checker.get_lexicon(dictionary, language).layers
+        self.paragraphs = self._split(text)
+        self.length = len(text)
+        self.mistakes, self.tiers = self._check_paragraphs(self.paragraphs)
+
+    @staticmethod
+    def _split(text):
+        # Separators stay attached so the paragraphs join back to the text
+        return text.splitlines(keepends=True) or ['']
+
+    def __len__(self):
+        return self.length
+
+    def all_mistakes(self):
+        found = []
+        start = 0
+        for paragraph, mistakes in zip(self.paragraphs, self.mistakes):
+            found.extend(dict(m, offset=start + m['offset']) for m in mistakes)
+            start += len(paragraph)
+        return found
+
+    def _check_paragraphs(self, paragraphs):
+        """Mistakes per paragraph, and tokens per tier across them.
+
+        Counted like ``check`` counts them, cached words included, so
+        ``tiers`` covers every token in the re-checked paragraphs.
+        """
+        cascade = self.checker.get_cascade(self.language)
+        phrases, tokens = [], []
+        covered = 0
+        for paragraph in paragraphs:
+            found, matches, count = cascade.find_phrases(paragraph)
+            phrases.append(found)
+            tokens.append(matches)
+            covered += count
+
+        # Cached verdicts are stale once the dictionary has been reloaded
+        # (or the language's lexicon was evicted and loaded again)
+        current = self.checker.get_lexicon(self.dictionary, self.language)
+        if any(old is not new for old, new in zip(self.layers, current.layers)):
+            self.verdicts.clear()
+            self.layers = current.layers
+
+        new_words = {m.group().lower() for matches in tokens for m in matches} - set(self.verdicts)
+        if new_words:
+            self.verdicts.update(self.checker.verdicts(sorted(new_words), current, self.language))
+
+        tiers = dict.fromkeys(cascade.tiers, 0)
+        tiers['unresolved'] = 0
+        if covered:
+            tiers['corrections'] += covered
         mistakes = []
-
-        for word in words:
-            if word.lower() in self.corrections:
-                mistakes.append({
-                    'word': word,
-                    'suggestion': self.corrections[word.lower()],
-                    'context': 'Offline spelling correction'
-                })
-
-        return mistakes
+        for found, matches in zip(phrases, tokens):
+            found = [
+                {'word': m['word'], 'offset': m['offset'], 'suggestion': m['suggestions'][0],
+                 'context': TIER_CONTEXT[m['tier']]}
+                for m in found
+            ]
+            for match in matches:
+                verdict = self.verdicts.get(match.group().lower())
+                if verdict is None:
+                    tiers['unresolved'] += 1
+                    continue
+                tier, suggestions = verdict
+                tiers[tier] += 1
+                if suggestions is not None:
+                    found.append({
+                        'word': match.group(),
+                        'offset': match.start(),
+                        'suggestion': cased(tier, suggestions, match.group())[0],
+                        'context': TIER_CONTEXT[tier]
+                    })
+            found.sort(key=lambda m: m['offset'])
+            mistakes.append(found)
+
+        return mistakes, tiers
+
+    def apply(self, offset, delete, insert):
+        """Apply one edit; returns the paragraph-aligned span that changed"""
+        length = len(self)
+        if offset < 0 or delete < 0 or offset + delete > length:
+            raise ValueError(f"Edit ({offset}, {delete}) outside text of length {length}")
+
+        starts = [0]
+        for paragraph in self.paragraphs:
+            starts.append(starts[-1] + len(paragraph))
+
+        first = max(0, bisect.bisect_right(starts, offset) - 1)
+        first = min(first, len(self.paragraphs) - 1)
+        last = min(bisect.bisect_right(starts, offset + delete) - 1, len(self.paragraphs) - 1)
+        last = max(last, first)
+
+        old = ''.join(self.paragraphs[first:last + 1])
+        local = offset - starts[first]
+        new = old[:local] + insert + old[local + delete:]
+
+        # Losing a trailing line break merges with the following paragraph
+        if last + 1 < len(self.paragraphs) and not new.endswith(('\n', '\r')):
+            last += 1
+            old += self.paragraphs[last]
+            new += self.paragraphs[last]
+
+        paragraphs = self._split(new)
+        mistakes, tiers = self._check_paragraphs(paragraphs)
+        self.paragraphs[first:last + 1] = paragraphs
+        self.mistakes[first:last + 1] = mistakes
+        self.length += len(new) - len(old)
+
+        start = starts[first]
+        changed = []
+        for paragraph, found in zip(paragraphs, mistakes):
+            changed.extend(dict(m, offset=start + m['offset']) for m in found)
+            start += len(paragraph)
+
+        span = {
+            'offset': starts[first],
+            'old_length': len(old),
+            'new_length': len(new),
+            'mistakes': changed
+        }
+        return span, tiers
+
+
+class EditSessionStore:
+    """In-memory edit sessions, expired by TTL and bounded in size.
+
+    Sessions live in the worker process that created them. The total size
+    is kept as a running count, so bounding it doesn't walk every document.
+    """
+
+    def __init__(self, ttl=1800, max_sessions=500, max_chars=20_000_000):
+        self.ttl = ttl
+        self.max_sessions = max_sessions
+        self.max_chars = max_chars
+        self.sessions = OrderedDict()
+        # session id -> length counted in ``chars`` for that session
+        self.sizes = {}
+        self.chars = 0
+        self.lock = threading.Lock()
+
+    def create(self, checker, text, dictionary=None, language='en-US'):
+        session = EditSession(checker, text, dictionary, language)
+        session_id = secrets.token_urlsafe(16)
+
+        with self.lock:
+            self.sessions[session_id] = session
+            self.sizes[session_id] = len(session)
+            self.chars += len(session)
+            self._evict()
+
+        return session_id, session
+
+    def get(self, session_id):
+        with self.lock:
+            self._evict()
+            session = self.sessions.get(session_id)
+            if session is not None:
+                session.touched = time.monotonic()
+                self.sessions.move_to_end(session_id)
+            return session
+
+    def resized(self, session_id):
+        """Account for edits applied to a session since it was last counted"""
+        with self.lock:
+            session = self.sessions.get(session_id)
+            if session is None:
+                return
+            self.chars += len(session) - self.sizes[session_id]
+            self.sizes[session_id] = len(session)
+            self._evict()
+
+    def discard(self, session_id):
+        with self.lock:
+            return self._remove(session_id) is not None
+
+    def _remove(self, session_id):
+        session = self.sessions.pop(session_id, None)
+        if session is not None:
+            self.chars -= self.sizes.pop(session_id)
+        return session
+
+    def _evict(self):
+        # Least recently used first, which is also the order they expire in
+        deadline = time.monotonic() - self.ttl
+        while self.sessions:
+            session_id, session = next(iter(self.sessions.items()))
+            if session.touched >= deadline and len(self.sessions) <= self.max_sessions:
+                break
+            self._remove(session_id)
+
+        while self.chars > self.max_chars and len(self.sessions) > 1:
+            self._remove(next(iter(self.sessions)))
 
 
 spell_checker = SpellCheckerAPI()
+edit_sessions = EditSessionStore()
 
 
 # ======================
@@ -110,7 +351,12 @@ def check_text_form():
     if not text:
         return render_template('index.html', error='Please enter some text')
 
-    mistakes = spell_checker.check_with_api(text)
+    dictionary = request.form.get('dictionary')
+    language = request.form.get('language', 'en-US')
+    try:
+        mistakes, _ = spell_checker.check(text, dictionary, language)
+    except KeyError as e:
+        return render_template('index.html', error=f'Unknown dictionary or language: {e.args[0]}')
 
     return render_template(
         'results.html',
@@ -131,14 +377,90 @@ def check_text():
     if not text:
         return jsonify({'error': 'No text provided'}), 400
 
-    mistakes = spell_checker.check_with_api(text)
+    dictionary = data.get('dictionary')
+    language = data.get('language', 'en-US')
+    try:
+        mistakes, tiers = spell_checker.check(text, dictionary, language)
+    except KeyError as e:
+        return jsonify({'error': f'Unknown dictionary or language: {e.args[0]}'}), 400
 
     return jsonify({
         'original_text': text,
-        'mistakes': mistakes
+        'mistakes': mistakes,
+        'tiers': tiers
+    })
+
+
+# ======================
+# EDIT SESSIONS (API)
+# ======================
+
+@app.route('/api/sessions', methods=['POST'])
+def create_session():
+    data = request.json or {}
+    text = data.get('text', '')
+
+    dictionary = data.get('dictionary')
+    language = data.get('language', 'en-US')
+    try:
+        session_id, session = edit_sessions.create(spell_checker, text, dictionary, language)
+    except KeyError as e:
+        return jsonify({'error': f'Unknown dictionary or language: {e.args[0]}'}), 400
+
+    return jsonify({
+        'session_id': session_id,
+        'mistakes': session.all_mistakes(),
+        'tiers': session.tiers
+    })
+
+
+@app.route('/api/sessions/<session_id>/edits', methods=['POST'])
+def edit_session(session_id):
+    session = edit_sessions.get(session_id)
+    if session is None:
+        return jsonify({'error': 'Unknown or expired session'}), 404
+
+    data = request.json or {}
+    changes = []
+    tiers = {}
+
+    # Edits apply in order, each against the text left by the previous one;
+    # each change says which span was replaced and the mistakes now in it
+    with session.lock:
+        try:
+            for edit in data.get('edits', []):
+                change, checked = session.apply(
+                    int(edit.get('offset', 0)),
+                    int(edit.get('delete', 0)),
+                    str(edit.get('insert', ''))
+                )
+                changes.append(change)
+                for tier, count in checked.items():
+                    tiers[tier] = tiers.get(tier, 0) + count
+        except (ValueError, TypeError, AttributeError) as e:
+            return jsonify({'error': f'Invalid edit: {e}', 'changes': changes}), 400
+        except KeyError as e:
+            # The session's dictionary was removed; it can't be checked again
+            edit_sessions.discard(session_id)
+            return jsonify({'error': f'Unknown dictionary or language: {e.args[0]}', 'changes': changes}), 410
+        finally:
+            edit_sessions.resized(session_id)
+
+    return jsonify({
+        'session_id': session_id,
+        'changes': changes,
+        'tiers': tiers
     })
 
 
+@app.route('/api/sessions/<session_id>', methods=['DELETE'])
+def close_session(session_id):
+    if not edit_sessions.discard(session_id):
+        return jsonify({'error': 'Unknown or expired session'}), 404
+
+    return jsonify({'session_id': session_id})
+
+
 # ======================
 # PDF EXTRACTION
 # ======================
@@ -153,6 +475,8 @@ def extract_pdf():
     text = ''
 
     try:
+        import PyPDF2
+
         pdf_reader = PyPDF2.PdfReader(io.BytesIO(pdf_bytes))
 
         for page in pdf_reader.pages:
@@ -185,6 +509,8 @@ def check_website_zip():
     all_text = ''
 
     try:
+        from bs4 import BeautifulSoup
+
         with zipfile.ZipFile(io.BytesIO(zip_bytes)) as zf:
             for file_name in zf.namelist():
                 if file_name.endswith(('.html', '.htm', '.txt')):
@@ -205,11 +531,17 @@ def check_website_zip():
         if not all_text:
             return jsonify({'error': 'No text found in ZIP'}), 400
 
-        mistakes = spell_checker.check_with_api(all_text)
+        dictionary = request.form.get('dictionary')
+        language = request.form.get('language', 'en-US')
+        try:
+            mistakes, tiers = spell_checker.check(all_text, dictionary, language)
+        except KeyError as e:
+            return jsonify({'error': f'Unknown dictionary or language: {e.args[0]}'}), 400
 
         return jsonify({
             'text': all_text[:5000],
-            'mistakes': mistakes
+            'mistakes': mistakes,
+            'tiers': tiers
         })
 
     except Exception:
@@ -0,0 +1,307 @@
+"""Non-interactive batch checking for the spell checker modules.
+
+Checks files, glob patterns or stdin and writes one JSON record per mistake:
+
+    {"file": "docs/a.txt", "offset": 120, "word": "teh", "suggestions": ["the"]}
+
+Input is streamed in chunks that never split a word, and files are fanned
+out across a process pool. The checker (and its dictionary) is built once in
+the parent before the pool forks, so workers share it read-only instead of
+each loading or unpickling their own copy.
+
+Any checker with a ``find_mistakes(text)`` method returning dicts with
+``word``, ``offset`` and ``suggestions`` keys can be driven from here.
+
+``check_sharded`` applies the same idea to one very large text: it is cut
+into shards between words and checked on a forked pool, with offsets merged
+back in order.
+"""
+import collections
+import functools
+import gc
+import glob
+import json
+import os
+import sys
+import threading
+
+# argparse and multiprocessing are imported where used: importing a checker
+# module for a plain text check should not pay for them
+
+CHUNK_SIZE = 1 << 16
+STDIN = '-'
+
+# Texts shorter than this are checked serially; forking is not worth it
+PARALLEL_THRESHOLD = 1 << 18
+
+# Set in the parent before the pool is created so forked workers inherit it
+_checker = None
+_shard_func = None
+_shard_text = None
+_shard_lock = threading.Lock()
+
+
+def _is_word_char(char):
+    return char.isalnum() or char == '_'
+
+
+def iter_chunks(stream, chunk_size=CHUNK_SIZE):
+    """Yield (offset, text) pieces of a stream that never split a word"""
+    offset = 0
+    carry = ''
+
+    while True:
+        block = stream.read(chunk_size)
+        if not block:
+            break
+
+        block = carry + block
+        cut = len(block)
+        while cut and _is_word_char(block[cut - 1]):
+            cut -= 1
+
+        # A single "word" longer than several chunks is not prose; emit it
+        # rather than buffering without bound
+        if cut == 0 and len(block) < 4 * chunk_size:
+            carry = block
+            continue
+        cut = cut or len(block)
+
+        yield offset, block[:cut]
+        offset += cut
+        carry = block[cut:]
+
+    if carry:
+        yield offset, carry
+
+
+def _records(name, base, text):
+    for mistake in _checker.find_mistakes(text):
+        yield json.dumps({
+            'file': name,
+            'offset': base + mistake['offset'],
+            'word': mistake['word'],
+            'suggestions': mistake['suggestions']
+        })
+
+
+def _check_file(task):
+    """Stream one file through the checker; runs inside a pool worker"""
+    path, chunk_size = task
+    lines = []
+
+    try:
+        with open(path, encoding='utf-8', errors='replace') as stream:
+            for base, text in iter_chunks(stream, chunk_size):
+                lines.extend(_records(path, base, text))
+    except OSError as e:
+        return path, lines, str(e)
+
+    return path, lines, None
+
+
+def _check_chunk(task):
+    name, base, text = task
+    return list(_records(name, base, text))
+
+
+def _init_worker(factory):
+    global _checker
+    _checker = factory()
+
+
+def expand_inputs(patterns):
+    """Expand glob patterns into file paths, keeping '-' for stdin"""
+    paths = []
+
+    for pattern in patterns:
+        if pattern == STDIN:
+            paths.append(STDIN)
+        elif glob.has_magic(pattern):
+            paths.extend(sorted(p for p in glob.glob(pattern, recursive=True) if os.path.isfile(p)))
+        else:
+            paths.append(pattern)
+
+    return paths
+
+
+def make_pool(jobs, factory=None):
+    """Create a process pool whose workers share the already loaded checker.
+
+    With the fork start method workers inherit ``_checker`` copy-on-write.
+    Elsewhere each worker has to build its own from ``factory``.
+    """
+    import multiprocessing
+
+    if 'fork' in multiprocessing.get_all_start_methods():
+        # Keep the cyclic GC from touching (and so copying) the dictionary
+        # pages the children inherit
+        gc.freeze()
+        try:
+            return multiprocessing.get_context('fork').Pool(jobs)
+        finally:
+            gc.unfreeze()
+
+    return multiprocessing.Pool(jobs, initializer=_init_worker, initargs=(factory,))
+
+
+def split_shards(text, count):
+    """Split text into about ``count`` (start, end) spans cut between words"""
+    size = max(1, -(-len(text) // count))
+    spans = []
+    start = 0
+
+    while start < len(text):
+        end = min(start + size, len(text))
+        while end < len(text) and _is_word_char(text[end - 1]) and _is_word_char(text[end]):
+            end += 1
+        spans.append((start, end))
+        start = end
+
+    return spans
+
+
+def _check_shard(span):
+    start, end = span
+    mistakes = _shard_func(_shard_text[start:end])
+    for mistake in mistakes:
+        mistake['offset'] += start
+    return mistakes
+
+
+def check_sharded(func, text, jobs=None, threshold=PARALLEL_THRESHOLD):
+    """Run ``func(text)`` over shards of a large text on a process pool.
+
+    ``func`` returns a list of dicts with an ``offset`` key, e.g. a bound
+    ``find_mistakes``. The function, its dictionary and the text reach the
+    workers through fork, so nothing but shard bounds and results is
+    pickled. Small texts, single-core hosts, platforms without fork, calls
+    made from inside a pool worker and processes running other threads all
+    run serially: forking a threaded process (e.g. a threaded web server)
+    can deadlock the child on a lock some other thread held.
+    """
+    jobs = jobs or os.cpu_count() or 1
+    if len(text) < threshold or jobs < 2:
+        return func(text)
+
+    import multiprocessing
+
+    if ('fork' not in multiprocessing.get_all_start_methods()
+            or multiprocessing.current_process().daemon
+            or threading.active_count() > 1):
+        return func(text)
+
+    global _shard_func, _shard_text
+    # Only the fork itself needs the globals; hold the lock until the
+    # workers exist so concurrent callers don't hand them each other's text
+    with _shard_lock:
+        _shard_func, _shard_text = func, text
+        try:
+            pool = make_pool(jobs)
+        finally:
+            _shard_func = _shard_text = None
+
+    try:
+        results = pool.map(_check_shard, split_shards(text, jobs * 4))
+    finally:
+        pool.close()
+        pool.join()
+
+    return [mistake for shard in results for mistake in shard]
+
+
+def _ordered_imap(pool, func, tasks, window):
+    """Like pool.imap, but never reads more than ``window`` tasks ahead"""
+    pending = collections.deque()
+
+    for task in tasks:
+        pending.append(pool.apply_async(func, (task,)))
+        if len(pending) >= window:
+            yield pending.popleft().get()
+
+    while pending:
+        yield pending.popleft().get()
+
+
+def run(checker, inputs, out, jobs=1, chunk_size=CHUNK_SIZE, factory=None):
+    """Check every input and write JSONL records to ``out``; returns error count"""
+    global _checker
+    _checker = checker
+    errors = 0
+
+    files = [path for path in inputs if path != STDIN]
+    pool = make_pool(jobs, factory) if jobs > 1 else None
+
+    try:
+        if STDIN in inputs:
+            tasks = (('<stdin>', base, text) for base, text in iter_chunks(sys.stdin, chunk_size))
+            if pool:
+                results = _ordered_imap(pool, _check_chunk, tasks, jobs * 2)
+            else:
+                results = map(_check_chunk, tasks)
+            for lines in results:
+                for line in lines:
+                    out.write(line + '\n')
+
+        tasks = [(path, chunk_size) for path in files]
+        if pool:
+            results = pool.imap_unordered(_check_file, tasks, chunksize=max(1, len(tasks) // (jobs * 16)))
+        else:
+            results = map(_check_file, tasks)
+
+        for path, lines, error in results:
+            for line in lines:
+                out.write(line + '\n')
+            if error:
+                errors += 1
+                print(f"{path}: {error}", file=sys.stderr)
+    except BaseException:
+        # Don't wait for the rest of the work once the output is gone
+        if pool:
+            pool.terminate()
+        raise
+    finally:
+        if pool:
+            pool.close()
+            pool.join()
+
+    return errors
+
+
+def main(factory, argv, prog=None):
+    """Command line entry point shared by the checker modules"""
+    import argparse
+
+    parser = argparse.ArgumentParser(
+        prog=prog,
+        description="Check files, glob patterns or stdin ('-') and print mistakes as JSON lines."
+    )
+    parser.add_argument('inputs', nargs='+', help="files, glob patterns (quote them) or - for stdin")
+    parser.add_argument('-j', '--jobs', type=int, default=os.cpu_count() or 1,
+                        help="worker processes (default: number of CPUs)")
+    parser.add_argument('-o', '--output', default=STDIN, help="write records here instead of stdout")
+    parser.add_argument('--chunk-size', type=int, default=CHUNK_SIZE,
+                        help="characters read per chunk (default: %(default)s)")
+    parser.add_argument('--language', default='en-US', help="language to check (default: %(default)s)")
+    args = parser.parse_args(argv)
+
+    inputs = expand_inputs(args.inputs)
+    factory = functools.partial(factory, language=args.language)
+    try:
+        checker = factory()
+    except KeyError:
+        parser.error(f"no word list for language {args.language!r}")
+
+    try:
+        if args.output == STDIN:
+            errors = run(checker, inputs, sys.stdout, args.jobs, args.chunk_size, factory)
+        else:
+            with open(args.output, 'w', encoding='utf-8') as out:
+                errors = run(checker, inputs, out, args.jobs, args.chunk_size, factory)
+    except BrokenPipeError:
+        # The reader went away (e.g. piped into head): stop quietly, and point
+        # stdout at devnull so the interpreter's final flush doesn't fail too
+        os.dup2(os.open(os.devnull, os.O_WRONLY), sys.stdout.fileno())
+        return 1
+
+    return 1 if errors else 0
@@ -0,0 +1,266 @@
+"""Tiered spell checking: cheap tiers first, remote services last.
+
+Each tier resolves as many of the remaining distinct words as it can and
+passes only the leftovers down:
+
+    lexicon      known words are accepted outright
+    corrections  hits from the correction rules, found in one pass over
+                 the text; rules spanning several words ("could of")
+                 claim their tokens before any tier runs
+    index        closest words from the lexicon's suggestion index
+    remote       an online checker, asked only about the residue
+
+Most tokens in real text are correctly spelled and never leave the first
+tier, so the remote service sees a small fraction of the input.
+"""
+import functools
+import re
+from bisect import bisect_left
+
+import batch_check
+from phrase_rules import PhraseAutomaton, match_case
+
+TIERS = ('lexicon', 'corrections', 'index', 'remote')
+
+# Runs of letters in any script, so accented and non-Latin words stay whole
+WORD_PATTERN = r'\b[^\W\d_]+\b'
+
+
+def cased(tier, suggestions, token):
+    """Suggestions for one occurrence of a word resolved by ``tier``.
+
+    Rule replacements follow the case of each occurrence ('Teh' -> 'The');
+    other tiers' suggestions are returned as they are.
+    """
+    if tier != 'corrections':
+        return suggestions
+    return [match_case(suggestion, token) for suggestion in suggestions]
+
+
+class CheckCascade:
+    """Run text through a configurable sequence of checking tiers.
+
+    ``remote`` is called with a list of lowercase words and returns
+    ``{word: suggestion}`` for each word it could check, with ``None`` as
+    the suggestion for words it considers correct. Words it leaves out, or
+    all of them if it raises, stay unresolved.
+
+    ``corrections`` is a ``{pattern: correction}`` dict or an already
+    compiled PhraseAutomaton, so a table shared by many cascades is only
+    compiled once.
+    """
+
+    def __init__(self, lexicon=None, corrections=None, remote=None, tiers=TIERS,
+                 pattern=WORD_PATTERN):
+        unknown = set(tiers) - set(TIERS)
+        if unknown:
+            raise ValueError(f"Unknown tiers: {', '.join(sorted(unknown))}")
+
+        self.lexicon = lexicon
+        if not isinstance(corrections, PhraseAutomaton):
+            corrections = PhraseAutomaton(corrections or {})
+        self.corrections = corrections
+        self.remote = remote
+        self.tiers = tuple(tiers)
+        self.pattern = re.compile(pattern)
+        # Texts longer than this run the local tiers in shards on all cores
+        self.parallel_threshold = batch_check.PARALLEL_THRESHOLD
+        # Processes to shard across; None means one per core
+        self.jobs = None
+
+    def check(self, text, lexicon=None, remote=None):
+        """Check text; returns mistakes, unresolved tokens and per-tier counts.
+
+        ``lexicon`` and ``remote`` replace the cascade's own for this call
+        only, e.g. a language's lexicon layered with one tenant's overlay
+        and a remote checker bound to that language.
+
+        Texts over ``parallel_threshold`` run the local tiers in shards on
+        all cores; the remote tier then gets the merged residue in one call.
+        Phrases spanning a shard boundary are not matched.
+        """
+        lexicon = lexicon if lexicon is not None else self.lexicon
+        remote = remote if remote is not None else self.remote
+        if len(text) < self.parallel_threshold:
+            return self._check(text, lexicon, remote, self.tiers)
+
+        local = functools.partial(self._check_shard, lexicon=lexicon)
+        counts = dict.fromkeys(self.tiers, 0)
+        mistakes = []
+        occurrences = {}
+
+        for record in batch_check.check_sharded(local, text, self.jobs, self.parallel_threshold):
+            if 'tiers' in record:
+                for tier, count in record['tiers'].items():
+                    if tier in counts:
+                        counts[tier] += count
+            elif 'tier' in record:
+                mistakes.append(record)
+            else:
+                occurrences.setdefault(record['word'].lower(), []).append((record['word'], record['offset']))
+
+        tiers = ('remote',) if 'remote' in self.tiers else ()
+        return self._resolve(tiers, occurrences, lexicon, remote, {}, counts, mistakes)
+
+    def _check(self, text, lexicon, remote, tiers):
+        matches = list(self.pattern.finditer(text))
+        counts = dict.fromkeys(tiers, 0)
+        mistakes = []
+
+        corrected = {}
+        if 'corrections' in tiers and self.corrections:
+            matches = self._scan_rules(text, matches, corrected, mistakes, counts)
+
+        occurrences = {}
+        for match in matches:
+            occurrences.setdefault(match.group().lower(), []).append((match.group(), match.start()))
+
+        return self._resolve(tiers, occurrences, lexicon, remote, corrected, counts, mistakes)
+
+    def _check_shard(self, text, lexicon):
+        # Runs in a pool worker: the local tiers as offset-carrying records
+        # batch_check can merge, with the shard's tier counts in the last one
+        result = self._check(text, lexicon, None, [tier for tier in self.tiers if tier != 'remote'])
+        return result['mistakes'] + result['unresolved'] + [{'offset': 0, 'tiers': result['tiers']}]
+
+    def _resolve(self, tiers, occurrences, lexicon, remote, corrected, counts, mistakes):
+        """Pass distinct words down the tiers and collect the result"""
+        pending = set(occurrences)
+
+        for tier in tiers:
+            if not pending:
+                break
+
+            resolved = getattr(self, '_' + tier)(sorted(pending), lexicon, remote, corrected)
+            for word, suggestions in resolved.items():
+                pending.discard(word)
+                counts[tier] += len(occurrences[word])
+                if suggestions is not None:
+                    mistakes.extend(
+                        {'word': token, 'offset': offset,
+                         'suggestions': cased(tier, suggestions, token), 'tier': tier}
+                        for token, offset in occurrences[word]
+                    )
+
+        unresolved = [
+            {'word': token, 'offset': offset}
+            for word in pending for token, offset in occurrences[word]
+        ]
+        counts['unresolved'] = len(unresolved)
+
+        mistakes.sort(key=lambda m: m['offset'])
+        unresolved.sort(key=lambda m: m['offset'])
+        return {'mistakes': mistakes, 'unresolved': unresolved, 'tiers': counts}
+
+    def resolve_words(self, words, lexicon=None, remote=None):
+        """Resolve distinct lowercase words on their own, without any text.
+
+        For callers that cache results per word, like edit sessions. Returns
+        ``{word: (tier, suggestions)}`` with ``None`` suggestions for words
+        accepted as correct; words no tier could resolve are left out.
+        """
+        lexicon = lexicon if lexicon is not None else self.lexicon
+        remote = remote if remote is not None else self.remote
+
+        corrected = {}
+        if 'corrections' in self.tiers:
+            for word in words:
+                correction = self.corrections.get(word)
+                if correction is not None:
+                    corrected[word] = correction
+
+        pending = set(words)
+        found = {}
+        for tier in self.tiers:
+            if not pending:
+                break
+            for word, suggestions in getattr(self, '_' + tier)(sorted(pending), lexicon, remote, corrected).items():
+                pending.discard(word)
+                found[word] = (tier, suggestions)
+        return found
+
+    def find_phrases(self, text):
+        """Tokenize text and take out the tokens multi-word rules cover.
+
+        Returns ``(mistakes, matches, covered)``: the phrase mistakes, the
+        remaining token matches and the number of tokens the phrases took.
+        Callers resolving the remaining words with ``resolve_words`` get
+        the same result as ``check``.
+        """
+        matches = list(self.pattern.finditer(text))
+        mistakes = []
+        counts = {'corrections': 0}
+        if 'corrections' in self.tiers and self.corrections:
+            matches = self._scan_rules(text, matches, {}, mistakes, counts)
+        return mistakes, matches, counts['corrections']
+
+    def _scan_rules(self, text, matches, corrected, mistakes, counts):
+        """Run every correction rule over text in a single pass.
+
+        Single-word hits are recorded in ``corrected`` for the corrections
+        tier, so known words still win over the table. Phrase hits become
+        mistakes straight away and their tokens are returned removed.
+        """
+        starts = [match.start() for match in matches]
+        spans = []
+
+        for hit in self.corrections.scan(text):
+            first = bisect_left(starts, hit['start'])
+            last = bisect_left(starts, hit['end'])
+            if last - first == 1 and matches[first].end() == hit['end'] and starts[first] == hit['start']:
+                corrected[matches[first].group().lower()] = self.corrections.replacements[hit['rule']]
+            elif last > first:
+                spans.append((hit, first, last))
+
+        claimed = set()
+        end = 0
+        # Leftmost-longest phrases that don't overlap
+        for hit, first, last in sorted(spans, key=lambda span: (span[0]['start'], -span[0]['end'])):
+            if hit['start'] < end:
+                continue
+            end = hit['end']
+            claimed.update(range(first, last))
+            counts['corrections'] += last - first
+            if hit['replacement'].lower() != hit['pattern']:
+                mistakes.append({'word': hit['match'], 'offset': hit['start'],
+                                 'suggestions': [hit['replacement']], 'tier': 'corrections'})
+
+        if not claimed:
+            return matches
+        return [match for i, match in enumerate(matches) if i not in claimed]
+
+    def _lexicon(self, words, lexicon, remote, corrected):
+        if lexicon is None:
+            return {}
+        return {word: None for word in words if word in lexicon}
+
+    def _corrections(self, words, lexicon, remote, corrected):
+        resolved = {}
+        for word in words:
+            correction = corrected.get(word)
+            if correction is not None:
+                resolved[word] = None if correction == word else [correction]
+        return resolved
+
+    def _index(self, words, lexicon, remote, corrected):
+        if lexicon is None:
+            return {}
+        resolved = {}
+        for word in words:
+            suggestions = lexicon.suggest(word)
+            if suggestions:
+                resolved[word] = suggestions
+        return resolved
+
+    def _remote(self, words, lexicon, remote, corrected):
+        if remote is None:
+            return {}
+        try:
+            found = remote(words)
+        except Exception:
+            return {}
+        wanted = set(words)
+        return {
+            word: [suggestion] if suggestion else None
+            for word, suggestion in found.items() if word in wanted
+        }
@@ -0,0 +1,67 @@
+"""Batched spelling checks against the public LanguageTool API.
+
+Words are sent one per line, as many per request as the API accepts, so
+checking a list of words costs a request per batch rather than per word.
+"""
+
+URL = "https://api.languagetool.org/v2/check"
+
+# LanguageTool rejects very large request bodies
+BATCH_CHARS = 15000
+
+
+def batches(words, limit=BATCH_CHARS):
+    """Split words into lists whose newline-joined text stays under limit"""
+    found = [[]]
+    size = 0
+    for word in words:
+        if found[-1] and size + len(word) >= limit:
+            found.append([])
+            size = 0
+        found[-1].append(word)
+        size += len(word) + 1
+    return [batch for batch in found if batch]
+
+
+def check_words(words, language='en-US', timeout=10):
+    """Ask LanguageTool about a list of words.
+
+    Returns ``{word: suggestion}`` with ``None`` for words it accepts and
+    the first replacement for misspelled ones. Misspelled words without a
+    replacement are left out. Network and HTTP errors are raised.
+    """
+    # requests is only needed once a check actually goes online
+    import requests
+
+    found = {}
+
+    for batch in batches(words):
+        data = {
+            'text': '\n'.join(batch),
+            'language': language
+        }
+
+        response = requests.post(URL, data=data, timeout=timeout)
+        response.raise_for_status()
+
+        starts = {}
+        offset = 0
+        for word in batch:
+            starts[offset] = word
+            found[word] = None
+            offset += len(word) + 1
+
+        for match in response.json()['matches']:
+            # One word per line trips capitalisation rules; only
+            # spelling matches are meaningful here
+            word = starts.get(match['offset'])
+            if word is None or match.get('rule', {}).get('issueType') != 'misspelling':
+                continue
+
+            suggestions = match.get('replacements', [])
+            if suggestions:
+                found[word] = suggestions[0]['value']
+            else:
+                del found[word]
+
+    return found
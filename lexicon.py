@@ -0,0 +1,862 @@
+"""Compiled word lists with an index for fast spelling suggestions.
+
+A ``Lexicon`` answers two questions quickly: is this word known, and which
+known words are closest to it. Suggestions use symmetric deletes: every word
+is indexed under itself and each of its single-character deletions. Indexing
+two deep would take about five times the memory, so the query side makes up
+for it: besides its own deletions up to two deep, a query probes its single
+substitutions and insertions and the substitutions of its single deletions.
+Together these reach every word within two edits. Only the handful of words
+sharing a key are compared with edit distance, instead of the whole list.
+
+The index is stored as two parallel arrays (sorted key hashes and word ids)
+rather than a dict of lists, which keeps it compact enough for word lists
+with hundreds of thousands of entries.
+
+A second, phonetic index maps Metaphone keys to word ids so sound-alike
+misspellings (``fonetik``, ``nolij``) that are too far away by edit distance
+still find their word. Build time and size of both indexes are recorded in
+``Lexicon.stats``; ``measure_lookups()`` adds lookup latency on request.
+
+Lexicons are per language (``lexicons/<language>.txt``) and are loaded on
+first use into an LRU cache bounded by ``LEXICON_BUDGET_MB``. Compiled
+indexes are saved next to the cached word lists, so only the first process
+on a host pays for the build; run ``python lexicon.py en-US`` to do that
+ahead of time.
+"""
+import array
+import bisect
+import json
+from collections import Counter
+import os
+import re
+import sys
+import threading
+import time
+import zlib
+from collections import OrderedDict
+
+LEXICON_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'lexicons')
+CACHE_DIR = os.path.join(LEXICON_DIR, '.cache')
+OVERLAY_DIR = os.path.join(LEXICON_DIR, 'overlays')
+FALLBACK_DIR = os.path.join(LEXICON_DIR, 'fallback')
+
+OVERLAY_NAME = re.compile(r'^[A-Za-z0-9_-]+$')
+LANGUAGE_NAME = re.compile(r'^[A-Za-z]{2,3}(-[A-Za-z0-9]{2,8})*$')
+
+# Where to fetch a language's word list when there is no local copy yet
+WORD_LIST_URLS = {
+    'en-US': "https://raw.githubusercontent.com/dwyl/english-words/master/words_alpha.txt",
+}
+
+# Bumped whenever the layout written by Lexicon.save changes
+COMPILED_FORMAT = 2
+
+# How long a language stays on its fallback list before the download is retried
+RETRY_SECONDS = 60
+
+MAX_DISTANCE = 2
+
+# Letters tried when probing substitutions and insertions: the most common
+# ones in the word list, so large scripts don't multiply the probes
+ALPHABET_SIZE = 40
+
+VOWELS = frozenset('aeiou')
+
+
+def edit_distance(s1, s2, limit=None):
+    """Levenshtein distance, giving up early once it must exceed ``limit``"""
+    if len(s1) < len(s2):
+        s1, s2 = s2, s1
+    if limit is not None and len(s1) - len(s2) > limit:
+        return limit + 1
+    if not s2:
+        return len(s1)
+
+    previous_row = list(range(len(s2) + 1))
+    for i, c1 in enumerate(s1):
+        current_row = [i + 1]
+        for j, c2 in enumerate(s2):
+            current_row.append(min(
+                previous_row[j + 1] + 1,
+                current_row[j] + 1,
+                previous_row[j] + (c1 != c2)
+            ))
+        if limit is not None and min(current_row) > limit:
+            return limit + 1
+        previous_row = current_row
+
+    return previous_row[-1]
+
+
+def _deletes(word, depth):
+    """The word plus every string reachable by deleting up to ``depth`` characters"""
+    found = {word}
+    frontier = {word}
+
+    for _ in range(depth):
+        frontier = {w[:i] + w[i + 1:] for w in frontier for i in range(len(w))} - found
+        found |= frontier
+
+    return found
+
+
+def phonetic_key(word):
+    """Metaphone key of a word: similar-sounding words share a key"""
+    word = ''.join(c for c in word.lower() if 'a' <= c <= 'z')
+    if not word:
+        return ''
+
+    if word[:2] in ('ae', 'gn', 'kn', 'pn', 'wr'):
+        word = word[1:]
+    elif word[0] == 'x':
+        word = 's' + word[1:]
+    elif word[:2] == 'wh':
+        word = 'w' + word[2:]
+
+    key = [word[0].upper()] if word[0] in VOWELS else []
+    length = len(word)
+
+    for i, c in enumerate(word):
+        prev = word[i - 1] if i else ''
+        nxt = word[i + 1] if i + 1 < length else ''
+        after = word[i + 2] if i + 2 < length else ''
+
+        if c in VOWELS or (c == prev and c != 'c'):
+            continue
+
+        if c == 'b':
+            if not (prev == 'm' and not nxt):
+                key.append('B')
+        elif c == 'c':
+            if nxt == 'i' and after == 'a' or nxt == 'h':
+                key.append('K' if prev == 's' else 'X')
+            elif nxt in ('i', 'e', 'y'):
+                if prev != 's':
+                    key.append('S')
+            else:
+                key.append('K')
+        elif c == 'd':
+            key.append('J' if nxt == 'g' and after in ('e', 'i', 'y') else 'T')
+        elif c == 'g':
+            if nxt == 'h' and after not in VOWELS:
+                continue
+            if nxt == 'n' and word[i + 1:] in ('n', 'ned'):
+                continue
+            if prev == 'd' and nxt in ('e', 'i', 'y'):
+                continue
+            key.append('J' if nxt in ('e', 'i', 'y') else 'K')
+        elif c == 'h':
+            if prev not in ('c', 's', 'p', 't', 'g') and nxt in VOWELS:
+                key.append('H')
+        elif c == 'k':
+            if prev != 'c':
+                key.append('K')
+        elif c == 'p':
+            key.append('F' if nxt == 'h' else 'P')
+        elif c == 'q':
+            key.append('K')
+        elif c == 's':
+            if nxt == 'h' or (nxt == 'i' and after in ('o', 'a')):
+                key.append('X')
+            else:
+                key.append('S')
+        elif c == 't':
+            if nxt == 'i' and after in ('o', 'a'):
+                key.append('X')
+            elif nxt == 'h':
+                key.append('0')
+            elif not (nxt == 'c' and after == 'h'):
+                key.append('T')
+        elif c == 'v':
+            key.append('F')
+        elif c in ('w', 'y'):
+            if nxt in VOWELS:
+                key.append(c.upper())
+        elif c == 'x':
+            key.append('KS')
+        elif c == 'z':
+            key.append('S')
+        else:
+            key.append(c.upper())
+
+    return ''.join(key)
+
+
+def _key(text):
+    return zlib.crc32(text.encode('utf-8'))
+
+
+def _score(word, close, sounding):
+    """Rank candidate words as (score, distance, word) tuples.
+
+    ``close`` come from the deletion index and must be within MAX_DISTANCE.
+    ``sounding`` share the word's phonetic key; they may be much further
+    away by spelling, and the shared key counts as one edit in their favour.
+    """
+    seen = set()
+    scored = []
+
+    for candidate in close:
+        if candidate in seen:
+            continue
+        seen.add(candidate)
+        distance = edit_distance(word, candidate, MAX_DISTANCE)
+        if 0 < distance <= MAX_DISTANCE:
+            scored.append((distance, distance, candidate))
+
+    limit = len(word) + MAX_DISTANCE
+    for candidate in sounding:
+        if candidate in seen:
+            continue
+        seen.add(candidate)
+        distance = edit_distance(word, candidate, limit)
+        if 0 < distance <= limit:
+            scored.append((distance - 1, distance, candidate))
+
+    return scored
+
+
+def _best(scored, limit):
+    best = []
+    for _, _, candidate in sorted(scored):
+        if candidate not in best:
+            best.append(candidate)
+            if len(best) == limit:
+                break
+    return best
+
+
+class Lexicon:
+    """An immutable word list with a suggestion index"""
+
+    def __init__(self, words):
+        start = time.perf_counter()
+
+        self.words = sorted({word.strip().lower() for word in words if word.strip()})
+        self._ids = {word: i for i, word in enumerate(self.words)}
+        counts = Counter(''.join(self.words))
+        self.alphabet = ''.join(char for char, _ in counts.most_common(ALPHABET_SIZE))
+
+        pairs = sorted(
+            (_key(variant) << 32) | word_id
+            for word_id, word in enumerate(self.words)
+            for variant in _deletes(word, 1)
+        )
+        self._keys = array.array('I', (pair >> 32 for pair in pairs))
+        self._postings = array.array('I', (pair & 0xFFFFFFFF for pair in pairs))
+        del pairs
+
+        self.stats = {
+            'words': len(self.words),
+            'index_entries': len(self._keys),
+            'index_bytes': (self._keys.itemsize + self._postings.itemsize) * len(self._keys),
+            'build_seconds': round(time.perf_counter() - start, 4),
+        }
+
+        self._build_phonetic_index()
+
+        self.stats['resident_bytes'] = (
+            sys.getsizeof(self.words) + sum(sys.getsizeof(word) for word in self.words)
+            + sys.getsizeof(self._ids)
+            + self.stats['index_bytes'] + self.stats['phonetic_bytes']
+        )
+
+    def save(self, path, source=None):
+        """Write the compiled lexicon to path, tagged with its source's stamp"""
+        slots = sorted(self._phonetic_slots, key=self._phonetic_slots.get)
+        sections = [
+            '\n'.join(self.words).encode('utf-8'),
+            '\n'.join(slots).encode('utf-8'),
+            self._keys.tobytes(),
+            self._postings.tobytes(),
+            self._phonetic_bounds.tobytes(),
+            self._phonetic_ids.tobytes(),
+        ]
+        header = {
+            'format': COMPILED_FORMAT,
+            'source': source,
+            'itemsize': self._keys.itemsize,
+            'byteorder': sys.byteorder,
+            'alphabet': self.alphabet,
+            'sections': [len(section) for section in sections],
+            'stats': self.stats,
+        }
+
+        # Written aside and renamed, so other workers never read half a file
+        temporary = f'{path}.{os.getpid()}.tmp'
+        try:
+            with open(temporary, 'wb') as f:
+                f.write(json.dumps(header).encode('utf-8') + b'\n')
+                for section in sections:
+                    f.write(section)
+            os.replace(temporary, path)
+        finally:
+            if os.path.exists(temporary):
+                os.remove(temporary)
+
+    @classmethod
+    def load(cls, path, source=None):
+        """A lexicon written by save; raises ValueError if it is stale or damaged"""
+        start = time.perf_counter()
+
+        with open(path, 'rb') as f:
+            header = json.loads(f.readline())
+            if (header.get('format') != COMPILED_FORMAT or header.get('source') != source
+                    or header.get('itemsize') != array.array('I').itemsize
+                    or header.get('byteorder') != sys.byteorder):
+                raise ValueError(f"{path} is out of date")
+            sections = [f.read(size) for size in header['sections']]
+
+        if [len(section) for section in sections] != header['sections'] or len(sections) != 6:
+            raise ValueError(f"{path} is truncated")
+
+        words, slots = (section.decode('utf-8').split('\n') if section else [] for section in sections[:2])
+        lexicon = cls.__new__(cls)
+        lexicon.words = words
+        lexicon._ids = {word: i for i, word in enumerate(words)}
+        lexicon.alphabet = header['alphabet']
+        lexicon._phonetic_slots = {key: slot for slot, key in enumerate(slots)}
+
+        for name, section in zip(('_keys', '_postings', '_phonetic_bounds', '_phonetic_ids'), sections[2:]):
+            values = array.array('I')
+            values.frombytes(section)
+            setattr(lexicon, name, values)
+
+        lexicon.stats = dict(header['stats'], load_seconds=round(time.perf_counter() - start, 4))
+        return lexicon
+
+    def _build_phonetic_index(self):
+        # CSR layout: the ids of the words sharing a key are contiguous in
+        # _phonetic_ids, between the bounds stored for that key's slot
+        start = time.perf_counter()
+
+        # Words without Latin letters have no key; they only get edit-distance
+        # suggestions rather than one giant bucket
+        keyed = sorted(
+            (key, word_id) for key, word_id in
+            ((phonetic_key(word), word_id) for word_id, word in enumerate(self.words)) if key
+        )
+        self._phonetic_slots = {}
+        self._phonetic_bounds = array.array('I')
+        self._phonetic_ids = array.array('I', (word_id for _, word_id in keyed))
+
+        for position, (key, _) in enumerate(keyed):
+            if key not in self._phonetic_slots:
+                self._phonetic_slots[key] = len(self._phonetic_bounds)
+                self._phonetic_bounds.append(position)
+        self._phonetic_bounds.append(len(keyed))
+
+        self.stats.update({
+            'phonetic_keys': len(self._phonetic_slots),
+            'phonetic_bytes': (
+                sys.getsizeof(self._phonetic_slots)
+                + sum(sys.getsizeof(key) for key in self._phonetic_slots)
+                + self._phonetic_bounds.itemsize * len(self._phonetic_bounds)
+                + self._phonetic_ids.itemsize * len(self._phonetic_ids)
+            ),
+            'phonetic_build_seconds': round(time.perf_counter() - start, 4),
+        })
+
+    def measure_lookups(self, samples=100):
+        """Time sample lookups and add their latency to ``stats``.
+
+        Not run on construction, so checkers building a lexicon in-process
+        don't pay for a benchmark; ``load_lexicon`` runs it once before
+        saving, so saved copies carry it.
+        """
+        # Probe with misspelled versions of words spread across the list
+        step = max(1, len(self.words) // samples)
+        probes = [word[1:] + word[0] for word in self.words[::step][:samples]]
+        if not probes:
+            return self.stats
+
+        start = time.perf_counter()
+        for probe in probes:
+            self.sound_alikes(probe)
+        phonetic = time.perf_counter() - start
+
+        start = time.perf_counter()
+        for probe in probes:
+            self.suggest(probe)
+        suggest = time.perf_counter() - start
+
+        self.stats.update({
+            'phonetic_lookup_us': round(phonetic / len(probes) * 1e6, 2),
+            'suggest_ms': round(suggest / len(probes) * 1e3, 3),
+        })
+        return self.stats
+
+    def sound_alikes(self, word):
+        """Ids of the words sharing this word's phonetic key"""
+        slot = self._phonetic_slots.get(phonetic_key(word) or None)
+        if slot is None:
+            return ()
+        return self._phonetic_ids[self._phonetic_bounds[slot]:self._phonetic_bounds[slot + 1]]
+
+    @property
+    def layers(self):
+        return (self,)
+
+    def __contains__(self, word):
+        return word in self._ids
+
+    def __len__(self):
+        return len(self.words)
+
+    def __iter__(self):
+        return iter(self.words)
+
+    def _probes(self, word):
+        # The index is one deletion deep; these cover the second level for
+        # words that need it (two substitutions, or a word missing letters)
+        probes = _deletes(word, MAX_DISTANCE)
+        for variant in _deletes(word, 1):
+            for i in range(len(variant)):
+                head, tail = variant[:i], variant[i + 1:]
+                probes.update(head + char + tail for char in self.alphabet)
+        for i in range(len(word) + 1):
+            head, tail = word[:i], word[i:]
+            probes.update(head + char + tail for char in self.alphabet)
+        return probes
+
+    def candidates(self, word):
+        """Scored suggestion candidates for a lowercase word"""
+        keys = self._keys
+        close = []
+
+        for variant in self._probes(word):
+            key = _key(variant)
+            i = bisect.bisect_left(keys, key)
+            while i < len(keys) and keys[i] == key:
+                close.append(self.words[self._postings[i]])
+                i += 1
+
+        sounding = (self.words[word_id] for word_id in self.sound_alikes(word))
+        return _score(word, close, sounding)
+
+    def suggest(self, word, limit=3):
+        """Known words within edit distance 2 or sounding alike, best first
+
+        >>> Lexicon(['hello', 'abcd']).suggest('hxllx')
+        ['hello']
+        >>> Lexicon(['hello', 'abcd']).suggest('axyd')
+        ['abcd']
+        """
+        return _best(self.candidates(word.lower()), limit)
+
+
+def _normalize(words):
+    """Lowercase words from a word list, skipping blanks and # comments"""
+    for word in words:
+        word = word.strip().lower()
+        if word and not word.startswith('#'):
+            yield word
+
+
+class Overlay:
+    """Extra words layered over a compiled Lexicon, e.g. one team's jargon.
+
+    Overlays are small, so their indexes are plain dicts of tuples and words
+    are indexed two deletions deep, with no need for extra probes. They are
+    never modified in place, so checks still holding an old overlay are
+    unaffected: ``updated`` copies the index dicts and re-indexes only the
+    words that were added or removed. The copy is still linear in the size
+    of the overlay, but it is a flat dict copy; re-indexing is what costs
+    (a one-word change to 20k words takes ~50 ms against ~1.2 s to build).
+    """
+
+    def __init__(self, words=()):
+        self.words = frozenset(_normalize(words))
+        self._deletes = {}
+        self._phonetic = {}
+        for word in self.words:
+            self._index(word)
+
+    def __contains__(self, word):
+        return word in self.words
+
+    def __len__(self):
+        return len(self.words)
+
+    def updated(self, words):
+        """A copy of this overlay holding exactly ``words``"""
+        words = frozenset(_normalize(words))
+        added = words - self.words
+        removed = self.words - words
+        if not added and not removed:
+            return self
+
+        overlay = Overlay()
+        overlay._deletes = dict(self._deletes)
+        overlay._phonetic = dict(self._phonetic)
+        for word in removed:
+            overlay._unindex(word)
+        for word in added:
+            overlay._index(word)
+        overlay.words = words
+        return overlay
+
+    def _index(self, word):
+        for variant in _deletes(word, MAX_DISTANCE):
+            self._deletes[variant] = self._deletes.get(variant, ()) + (word,)
+        key = phonetic_key(word)
+        if key:
+            self._phonetic[key] = self._phonetic.get(key, ()) + (word,)
+
+    def _unindex(self, word):
+        for table, keys in ((self._deletes, _deletes(word, MAX_DISTANCE)), (self._phonetic, [phonetic_key(word)])):
+            for key in keys:
+                rest = tuple(w for w in table.get(key, ()) if w != word)
+                if rest:
+                    table[key] = rest
+                else:
+                    table.pop(key, None)
+
+    def candidates(self, word):
+        """Scored suggestion candidates for a lowercase word"""
+        close = [w for variant in _deletes(word, MAX_DISTANCE) for w in self._deletes.get(variant, ())]
+        return _score(word, close, self._phonetic.get(phonetic_key(word) or None, ()))
+
+    def suggest(self, word, limit=3):
+        """Overlay words within edit distance 2 or sounding alike, best first
+
+        >>> Overlay(['hello', 'abcd']).suggest('hxllx')
+        ['hello']
+        """
+        return _best(self.candidates(word.lower()), limit)
+
+
+class LayeredLexicon:
+    """A read-only view of a base Lexicon with an Overlay on top"""
+
+    def __init__(self, base, overlay):
+        self.base = base
+        self.overlay = overlay
+
+    @property
+    def layers(self):
+        # Identity of what this view is made of; changes when either is swapped
+        return (self.base, self.overlay)
+
+    def __contains__(self, word):
+        return word in self.base or word in self.overlay
+
+    def __len__(self):
+        return len(self.base) + len(self.overlay)
+
+    def candidates(self, word):
+        return self.base.candidates(word) + self.overlay.candidates(word)
+
+    def suggest(self, word, limit=3):
+        """Suggestions from both layers, ranked together"""
+        return _best(self.candidates(word.lower()), limit)
+
+
+def _word_list_path(language):
+    for directory in (LEXICON_DIR, CACHE_DIR):
+        path = os.path.join(directory, f'{language}.txt')
+        if os.path.exists(path):
+            return path
+    return None
+
+
+def _read_words(f):
+    """Words from an open word list, one per line, with # comments skipped"""
+    return list(_normalize(f.read().splitlines()))
+
+
+def load_words(language='en-US'):
+    """Read a language's word list, downloading and caching it on first use.
+
+    Raises KeyError if there is no list for the language and OSError if it
+    could not be downloaded.
+    """
+    filename = f'{language}.txt'
+
+    path = _word_list_path(language)
+    if path is not None:
+        with open(path, encoding='utf-8') as f:
+            return _read_words(f)
+
+    url = WORD_LIST_URLS.get(language)
+    if not url:
+        raise KeyError(language)
+
+    try:
+        import requests
+    except ImportError as e:
+        raise OSError(f"requests is needed to download the {language} word list") from e
+
+    try:
+        response = requests.get(url, timeout=5)
+        response.raise_for_status()
+    except requests.RequestException as e:
+        raise OSError(f"Could not download the {language} word list: {e}") from e
+
+    words = list(_normalize(response.text.splitlines()))
+    if not words:
+        raise OSError(f"Downloaded {language} word list is empty")
+
+    # Written aside and renamed, so other workers never read half a list
+    path = os.path.join(CACHE_DIR, filename)
+    temporary = f'{path}.{os.getpid()}.tmp'
+    try:
+        os.makedirs(CACHE_DIR, exist_ok=True)
+        with open(temporary, 'w', encoding='utf-8') as f:
+            f.write('\n'.join(words))
+        os.replace(temporary, path)
+    except OSError:
+        pass
+    finally:
+        if os.path.exists(temporary):
+            os.remove(temporary)
+
+    print(f"Loaded {len(words)} {language} words from online dictionary", file=sys.stderr)
+    return words
+
+
+def load_lexicon(language='en-US'):
+    """A language's compiled lexicon, reusing the copy saved in CACHE_DIR.
+
+    The saved copy is only used while the word list it was built from is
+    unchanged. Raises like ``load_words``.
+    """
+    words = None
+    path = _word_list_path(language)
+    if path is None:
+        words = load_words(language)
+        path = _word_list_path(language)
+
+    source = None
+    compiled_path = os.path.join(CACHE_DIR, f'{language}.lexicon')
+    if path is not None:
+        # Stamp and words come from the same open file, so a list replaced
+        # meanwhile can't be compiled under another version's stamp
+        with open(path, encoding='utf-8') as f:
+            stat = os.fstat(f.fileno())
+            source = [stat.st_mtime_ns, stat.st_size]
+            try:
+                return Lexicon.load(compiled_path, source)
+            except (OSError, ValueError, KeyError):
+                pass
+            words = _read_words(f)
+
+    compiled = Lexicon(words)
+
+    if source is not None:
+        # Only the process saving the compiled copy pays for measuring it
+        compiled.measure_lookups()
+        try:
+            os.makedirs(CACHE_DIR, exist_ok=True)
+            compiled.save(compiled_path, source)
+        except OSError as e:
+            print(f"Could not save the compiled {language} lexicon: {e}", file=sys.stderr)
+
+    return compiled
+
+
+def fallback_words(language='en-US'):
+    """The small bundled word list for a language, or None if there is none"""
+    try:
+        with open(os.path.join(FALLBACK_DIR, f'{language}.txt'), encoding='utf-8') as f:
+            return _read_words(f)
+    except OSError:
+        return None
+
+
+def is_english(language):
+    """Whether a language tag is a variety of English (en, en-US, en-GB...)"""
+    return language.split('-')[0].lower() == 'en'
+
+
+def available(language):
+    """Whether a word list exists (or can be downloaded) for a language"""
+    if not isinstance(language, str) or not LANGUAGE_NAME.match(language):
+        return False
+    filename = f'{language}.txt'
+    return (
+        language in WORD_LIST_URLS
+        or os.path.exists(os.path.join(LEXICON_DIR, filename))
+        or os.path.exists(os.path.join(CACHE_DIR, filename))
+    )
+
+
+class LexiconCache:
+    """Compiled lexicons by language, loaded on first use and evicted LRU.
+
+    Workers only pay for the languages they are asked for. Once the
+    estimated size of the resident lexicons exceeds ``budget_bytes`` the
+    least recently used ones are dropped (the newest is always kept).
+    Checks still holding an evicted lexicon keep it alive until they finish.
+
+    If a word list can't be downloaded, the language's bundled fallback list
+    is served instead. It is never cached as the real lexicon: the download
+    is tried again once ``RETRY_SECONDS`` have passed.
+    """
+
+    def __init__(self, budget_bytes):
+        self.budget_bytes = budget_bytes
+        self._lexicons = OrderedDict()
+        self._lock = threading.Lock()
+        # One lock per language being loaded, so a slow download or build
+        # doesn't hold up lookups of other languages
+        self._loading = {}
+        # language -> (fallback lexicon, when to retry the real one)
+        self._fallbacks = {}
+
+    def get(self, language):
+        """The lexicon for a language; raises KeyError if there is none"""
+        # Languages come straight from request bodies, which may hold any JSON
+        if not isinstance(language, str):
+            raise KeyError(language)
+        with self._lock:
+            found = self._touch(language)
+            if found is not None:
+                return found
+            if not available(language):
+                raise KeyError(language)
+            fallback = self._fallbacks.get(language)
+            if fallback is not None and time.monotonic() < fallback[1]:
+                return fallback[0]
+            loading = self._loading.setdefault(language, threading.Lock())
+
+        # While a retry is under way everyone else keeps the fallback
+        if not loading.acquire(blocking=fallback is None):
+            return fallback[0]
+        try:
+            with self._lock:
+                found = self._touch(language)
+                if found is not None:
+                    return found
+
+            try:
+                compiled = load_lexicon(language)
+            except OSError as e:
+                return self._fall_back(language, e)
+
+            with self._lock:
+                self._lexicons[language] = compiled
+                self._loading.pop(language, None)
+                self._fallbacks.pop(language, None)
+                self._evict()
+        finally:
+            loading.release()
+
+        return compiled
+
+    def _fall_back(self, language, error):
+        with self._lock:
+            fallback = self._fallbacks.get(language)
+        if fallback is None:
+            words = fallback_words(language)
+            if not words:
+                raise error
+            fallback = (Lexicon(words), 0)
+            print(f"{error}; using the bundled list of {len(words)} words", file=sys.stderr)
+
+        with self._lock:
+            self._fallbacks[language] = (fallback[0], time.monotonic() + RETRY_SECONDS)
+        return fallback[0]
+
+    def resident(self):
+        """Languages currently loaded, least recently used first"""
+        with self._lock:
+            return list(self._lexicons)
+
+    def _touch(self, language):
+        found = self._lexicons.get(language)
+        if found is not None:
+            self._lexicons.move_to_end(language)
+        return found
+
+    def _evict(self):
+        total = sum(l.stats['resident_bytes'] for l in self._lexicons.values())
+        while total > self.budget_bytes and len(self._lexicons) > 1:
+            _, evicted = self._lexicons.popitem(last=False)
+            total -= evicted.stats['resident_bytes']
+
+
+lexicon_cache = LexiconCache(int(os.environ.get('LEXICON_BUDGET_MB', 512)) * 1024 * 1024)
+
+
+def get_lexicon(language='en-US'):
+    """The compiled lexicon for a language; raises KeyError if there is none"""
+    return lexicon_cache.get(language)
+
+
+class OverlayRegistry:
+    """Named overlays read from ``<directory>/<name>.txt`` and hot-reloaded.
+
+    Each worker notices edits by comparing the file's mtime and size, at
+    most every ``check_interval`` seconds. A changed file is diffed against
+    the loaded overlay and the result swapped in with a single assignment.
+    The reload runs in whichever check noticed the change; concurrent checks
+    keep using the previous overlay instead of waiting for it.
+    """
+
+    def __init__(self, directory=OVERLAY_DIR, check_interval=2.0):
+        self.directory = directory
+        self.check_interval = check_interval
+        # name -> (overlay, (mtime_ns, size), checked at)
+        self._entries = {}
+        self._reload_lock = threading.Lock()
+
+    def get(self, name):
+        """The current overlay called ``name``; raises KeyError if there is none"""
+        # Names come straight from request bodies, which may hold any JSON
+        if not isinstance(name, str) or not OVERLAY_NAME.match(name):
+            raise KeyError(name)
+
+        entry = self._entries.get(name)
+        if entry is not None and time.monotonic() - entry[2] < self.check_interval:
+            return entry[0]
+
+        # Only a first load has nothing to fall back on and has to wait
+        if not self._reload_lock.acquire(blocking=entry is None):
+            return entry[0]
+        try:
+            return self._reload(name)
+        finally:
+            self._reload_lock.release()
+
+    def _reload(self, name):
+        entry = self._entries.get(name)
+        path = os.path.join(self.directory, f'{name}.txt')
+
+        try:
+            stat = os.stat(path)
+        except OSError:
+            self._entries.pop(name, None)
+            raise KeyError(name)
+
+        stamp = (stat.st_mtime_ns, stat.st_size)
+        if entry is not None and entry[1] == stamp:
+            overlay = entry[0]
+        else:
+            with open(path, encoding='utf-8') as f:
+                words = f.read().splitlines()
+            overlay = (entry[0] if entry is not None else Overlay()).updated(words)
+
+        self._entries[name] = (overlay, stamp, time.monotonic())
+        return overlay
+
+
+overlays = OverlayRegistry()
+
+
+def get_layered(dictionary=None, language='en-US'):
+    """The base lexicon for a language, with a named overlay on top if given"""
+    base = get_lexicon(language)
+    if not dictionary:
+        return base
+    return LayeredLexicon(base, overlays.get(dictionary))
+
+
+if __name__ == '__main__':
+    # Compile and save lexicons ahead of time, e.g. while deploying
+    for language in sys.argv[1:] or ['en-US']:
+        compiled = load_lexicon(language)
+        if 'suggest_ms' not in compiled.stats:
+            compiled.measure_lookups()
+        print(f"{language}: {compiled.stats}")
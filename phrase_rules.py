@@ -0,0 +1,173 @@
+"""Correction rules compiled into one Aho-Corasick automaton.
+
+Rules map a misspelling or phrase to its correction (``teh`` -> ``the``,
+``could of`` -> ``could have``). Instead of probing a dict once per token,
+every rule is compiled into a single automaton that scans the text in one
+linear pass, so a table of tens of thousands of rules costs the same per
+character as one with ten.
+
+Matching ignores case and treats any run of whitespace as one space, so
+multi-token rules match across line breaks. Hits only count on whole-word
+boundaries, and replacements follow the case of the matched text.
+"""
+import time
+from collections import deque
+
+
+def _is_word_char(char):
+    return char.isalnum() or char == '_'
+
+
+def match_case(replacement, original):
+    """Give a replacement the capitalisation of the text it replaces"""
+    if len(original) > 1 and original.isupper():
+        return replacement.upper()
+    if original[:1].isupper():
+        return replacement[:1].upper() + replacement[1:]
+    return replacement
+
+
+class PhraseAutomaton:
+    """Scan text for every occurrence of any rule in one pass"""
+
+    def __init__(self, rules):
+        start = time.perf_counter()
+
+        # Trie as parallel lists indexed by state; state 0 is the root
+        self._goto = [{}]
+        self._fail = [0]
+        self._rule = [None]
+        # Nearest state on the failure chain that ends a rule, so reporting
+        # matches never walks states that don't
+        self._output = [0]
+
+        self.patterns = []
+        self.replacements = []
+
+        for pattern, replacement in rules.items():
+            key = ' '.join(pattern.lower().split())
+            if not key:
+                continue
+
+            state = 0
+            for char in key:
+                child = self._goto[state].get(char)
+                if child is None:
+                    child = len(self._goto)
+                    self._goto[state][char] = child
+                    self._goto.append({})
+                    self._fail.append(0)
+                    self._rule.append(None)
+                    self._output.append(0)
+                state = child
+
+            # The first rule for a pattern wins, as with a dict lookup
+            if self._rule[state] is None:
+                self._rule[state] = len(self.patterns)
+                self.patterns.append(key)
+                self.replacements.append(replacement)
+
+        queue = deque(self._goto[0].values())
+        while queue:
+            state = queue.popleft()
+            for char, child in self._goto[state].items():
+                fallback = self._fail[state]
+                while fallback and char not in self._goto[fallback]:
+                    fallback = self._fail[fallback]
+                fallback = self._goto[fallback].get(char, 0)
+
+                self._fail[child] = fallback
+                self._output[child] = fallback if self._rule[fallback] is not None else self._output[fallback]
+                queue.append(child)
+
+        self.max_length = max(map(len, self.patterns), default=0)
+        self.stats = {
+            'rules': len(self.patterns),
+            'states': len(self._goto),
+            'build_seconds': round(time.perf_counter() - start, 4),
+        }
+
+    def __len__(self):
+        return len(self.patterns)
+
+    def get(self, word, default=None):
+        """Replacement for a single word or phrase, like dict.get"""
+        state = 0
+        for char in ' '.join(word.lower().split()):
+            state = self._goto[state].get(char)
+            if state is None:
+                return default
+        rule = self._rule[state]
+        return default if rule is None else self.replacements[rule]
+
+    def scan(self, text, overlapping=True):
+        """Every rule hit in text, as dicts with start/end offsets.
+
+        ``rule`` indexes ``patterns`` and ``replacements``; ``replacement``
+        is already in the case of the matched text.
+
+        With ``overlapping=False`` only the leftmost-longest hits that don't
+        overlap are kept, which is what a corrector applies.
+        """
+        if not self.patterns:
+            return []
+
+        lowered = text.lower()
+        if len(lowered) != len(text):
+            # A few characters lowercase to more than one; keep offsets aligned
+            lowered = ''.join(char.lower()[:1] for char in text)
+
+        goto, fail, rules, output = self._goto, self._fail, self._rule, self._output
+        size = self.max_length
+        # Text offsets of the last ``size`` characters fed to the automaton
+        positions = [0] * size
+        fed = 0
+        state = 0
+        after_space = False
+        hits = []
+
+        for i, char in enumerate(lowered):
+            if char.isspace():
+                if after_space:
+                    continue
+                char = ' '
+                after_space = True
+            else:
+                after_space = False
+
+            positions[fed % size] = i
+            fed += 1
+
+            while state and char not in goto[state]:
+                state = fail[state]
+            state = goto[state].get(char, 0)
+
+            found = state if rules[state] is not None else output[state]
+            while found:
+                rule = rules[found]
+                start = positions[(fed - len(self.patterns[rule])) % size]
+                end = i + 1
+                if ((start == 0 or not _is_word_char(text[start - 1]))
+                        and (end == len(text) or not _is_word_char(text[end]))):
+                    matched = text[start:end]
+                    hits.append({
+                        'start': start,
+                        'end': end,
+                        'match': matched,
+                        'rule': rule,
+                        'pattern': self.patterns[rule],
+                        'replacement': match_case(self.replacements[rule], matched)
+                    })
+                found = output[found]
+
+        if overlapping:
+            hits.sort(key=lambda hit: (hit['start'], hit['end']))
+            return hits
+
+        kept = []
+        last_end = 0
+        for hit in sorted(hits, key=lambda hit: (hit['start'], hit['start'] - hit['end'])):
+            if hit['start'] >= last_end:
+                kept.append(hit)
+                last_end = hit['end']
+        return kept
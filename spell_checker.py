@@ -1,11 +1,13 @@
-import cv2
-import pytesseract
-from PIL import Image
-import numpy as np
-import re
+import sys
+
+import batch_check
+from cascade import CheckCascade
+import lexicon
+from lexicon import Lexicon
 
 class SpellCheckerApp:
-    def __init__(self):
+    def __init__(self, language='en-US'):
+        self.language = language
         # Common English words dictionary
         self.dictionary = {
             'hello', 'world', 'the', 'and', 'is', 'are', 'was', 'were', 'have', 'has', 'had',
@@ -134,40 +136,53 @@ class SpellCheckerApp:
             'well': 'we will', 'weve': 'we have', 'theyre': 'they are',
             'theyd': 'they would', 'theyll': 'they will', 'theyve': 'they have'
         }
+        
+        if language == 'en-US':
+            self.lexicon = Lexicon(self.dictionary)
+        else:
+            # Other languages and variants use their compiled word list
+            self.lexicon = lexicon.get_lexicon(language)
+            self.dictionary = self.lexicon
+        
+        if not lexicon.is_english(language):
+            # The corrections table is English only
+            self.corrections = {}
+        
+        # Known words are accepted before the corrections table and the
+        # suggestion index are consulted; this checker never goes online
+        self.cascade = CheckCascade(
+            self.lexicon, self.corrections,
+            tiers=('lexicon', 'corrections', 'index'),
+            pattern=r'\b\w+\b'
+        )
     
-    def check_text(self, text):
-        words = re.findall(r'\b\w+\b', text.lower())
-        mistakes = []
+    def find_mistakes(self, text):
+        result = self.cascade.check(text)
+        # Unknown words nothing could suggest for are still mistakes here
+        mistakes = [
+            {'word': m['word'], 'offset': m['offset'], 'suggestions': m.get('suggestions', [])}
+            for m in result['mistakes'] + result['unresolved']
+        ]
         
-        for word in words:
-            if word not in self.dictionary:
-                if word in self.corrections:
-                    mistakes.append(f"'{word}' -> '{self.corrections[word]}'")
-                else:
-                    # Simple suggestion based on common patterns
-                    suggestion = self.get_suggestion(word)
-                    mistakes.append(f"'{word}' -> '{suggestion}'")
+        return sorted(mistakes, key=lambda m: m['offset'])
+    
+    def check_text(self, text):
+        mistakes = [
+            f"'{m['word']}' -> '{m['suggestions'][0] if m['suggestions'] else 'No suggestion'}'"
+            for m in self.find_mistakes(text)
+        ]
         
         if not mistakes:
             return "No spelling mistakes found!"
         
         return f"Spelling mistakes: {', '.join(mistakes)}"
     
-    def get_suggestion(self, word):
-        # Simple suggestion logic
-        if word in self.corrections:
-            return self.corrections[word]
-        
-        # Check for common patterns
-        for correct_word in self.dictionary:
-            if len(word) == len(correct_word):
-                diff_count = sum(1 for a, b in zip(word, correct_word) if a != b)
-                if diff_count == 1:  # Only one character different
-                    return correct_word
-        
-        return "No suggestion"
-    
     def check_from_camera(self):
+        # OpenCV and Tesseract are only needed here; importing them lazily keeps
+        # text-only checks fast to start
+        import cv2
+        import pytesseract
+
         cap = cv2.VideoCapture(0)
         
         while True:
@@ -196,7 +211,12 @@ class SpellCheckerApp:
         cap.release()
         cv2.destroyAllWindows()
 
-def main():
+def main(argv=None):
+    if argv is None:
+        argv = sys.argv[1:]
+    if argv:
+        return batch_check.main(SpellCheckerApp, argv, prog='spell_checker.py')
+    
     checker = SpellCheckerApp()
     
     while True:
@@ -219,4 +239,4 @@ def main():
             break
 
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    sys.exit(main())
\ No newline at end of file
@@ -0,0 +1,88 @@
+"""Import-time and RSS budget check for the spell checker modules.
+
+Each module is imported in a fresh interpreter so the numbers match what a
+CLI invocation or a newly forked gunicorn worker pays. Run it from the
+repository root before deploying:
+
+    python startup_check.py
+
+Exits non-zero when a module is over budget or pulls in one of the heavy
+camera/OCR/PDF/HTML dependencies at import time.
+"""
+import json
+import subprocess
+import sys
+
+# module -> (max import seconds, max resident MiB)
+BUDGETS = {
+    'spell_checker': (0.05, 20),
+    'advanced_spell_checker': (0.05, 20),
+    'api_spell_checker': (0.05, 20),
+    'backend.app': (0.5, 60),
+}
+
+# Only needed by the camera, OCR, PDF, ZIP and remote API paths
+HEAVY_MODULES = ('cv2', 'pytesseract', 'PIL', 'numpy', 'PyPDF2', 'bs4', 'requests')
+
+PROBE = """
+import importlib, json, sys, time
+try:
+    import resource
+except ImportError:
+    resource = None
+
+def rss_mb():
+    if resource is None:
+        return 0.0
+    rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return rss / (1024 * 1024) if sys.platform == 'darwin' else rss / 1024
+
+start = time.perf_counter()
+try:
+    importlib.import_module(sys.argv[1])
+    error = None
+except Exception as e:
+    error = f"{type(e).__name__}: {e}"
+elapsed = time.perf_counter() - start
+heavy = sorted(name for name in sys.argv[2:] if name in sys.modules)
+json.dump({'seconds': elapsed, 'rss_mb': rss_mb(), 'heavy': heavy, 'error': error}, sys.stdout)
+"""
+
+
+def measure(module):
+    """Import a module in a fresh interpreter and report its cost"""
+    output = subprocess.run(
+        [sys.executable, '-c', PROBE, module, *HEAVY_MODULES],
+        capture_output=True, text=True, check=True
+    ).stdout
+    return json.loads(output)
+
+
+def main():
+    failures = 0
+
+    for module, (max_seconds, max_rss) in BUDGETS.items():
+        result = measure(module)
+        problems = []
+
+        if result['error']:
+            problems.append(result['error'])
+        if result['seconds'] > max_seconds:
+            problems.append(f"import took {result['seconds']:.3f}s (budget {max_seconds}s)")
+        if result['rss_mb'] > max_rss:
+            problems.append(f"RSS {result['rss_mb']:.1f} MiB (budget {max_rss} MiB)")
+        if result['heavy']:
+            problems.append(f"eagerly imports {', '.join(result['heavy'])}")
+
+        status = 'FAIL' if problems else 'ok'
+        print(f"{status:4} {module}: {result['seconds'] * 1000:.1f} ms, {result['rss_mb']:.1f} MiB")
+        for problem in problems:
+            print(f"     - {problem}")
+
+        failures += bool(problems)
+
+    return 1 if failures else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())